@@ -1,231 +1,525 @@
-import random
+import multiprocessing
+import sys
+import numpy as np
+import pandas as pd
 import mesa
 import mesa.visualization.modules as viz_modules
 import mesa.visualization.UserParam as UserParam
 
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # numba is optional, the step falls back to plain NumPy
+    HAVE_NUMBA = False
+
+# PyPy's JIT handles plain Python loops over lists far better than NumPy element access
+PURE_PYTHON = sys.implementation.name == "pypy"
+
 MIN_HASH_RATE = 0.01  # Minimum hash rate for individual miners
 MIN_NETWORK_HASH_RATE = 1.0  # Minimum total network hash rate
 PRICE_THRESHOLD = 5  # Price threshold for miner reactivation
+PRICE_DRAW_BATCH = 1024  # Steps of price walk randomness drawn per Generator call
+
+def _step_kernel(hash_rates, rewards, active, dormant_prices, initial_hash_rates, days_active,
+                 price, price_change_percentage, reward_per_block, total_network_hash_rate,
+                 mine_draws, randomness_factor, restart_factor):
+    # Single pass over all miners: block finding, hash rate adjustment and reactivation
+    if price_change_percentage > 5:
+        scale = 1.05
+    elif price_change_percentage < -5:
+        scale = 0.95
+    else:
+        scale = 0.0  # Price roughly flat, hash rates are left alone
+
+    blocks_found = 0
+    num_reactivated = 0
+    total_hash_rate = 0.0  # Network hash rate after the update, summed in the same pass
+    for i in range(len(hash_rates)):
+        if not active[i]:
+            # Reactivate if price increases significantly; the miner starts mining next step
+            if price > dormant_prices[i] * 1.1:
+                active[i] = True
+                hash_rates[i] = max(initial_hash_rates[i] * restart_factor[i], MIN_HASH_RATE)
+                num_reactivated += 1
+                total_hash_rate += hash_rates[i]
+            continue
+
+        if mine_draws[i] * total_network_hash_rate < hash_rates[i]:
+            rewards[i] += reward_per_block
+            blocks_found += 1
+
+        hash_rate = hash_rates[i]
+        if days_active[i] != 0 and scale != 0.0:
+            hash_rate *= scale * randomness_factor[i]
+        if hash_rate < MIN_HASH_RATE:
+            hash_rate = MIN_HASH_RATE
+        elif hash_rate > 100.0:
+            hash_rate = 100.0
+        hash_rates[i] = hash_rate
+        days_active[i] += 1
+        total_hash_rate += hash_rate
+
+    return blocks_found, num_reactivated, total_hash_rate
+
+if HAVE_NUMBA:
+    _step_kernel = njit(cache=True, fastmath=True)(_step_kernel)
+
+def _step_arrays(hash_rates, rewards, active, dormant_prices, initial_hash_rates, days_active,
+                 price, price_change_percentage, reward_per_block, total_network_hash_rate,
+                 mine_draws, randomness_factor, restart_factor):
+    # NumPy counterpart of _step_kernel, used when numba is not installed
+    mining = active.copy()
+    mine_draws *= total_network_hash_rate  # Compare scaled draws, avoiding a division per miner
+    hits = (mine_draws < hash_rates) & mining
+    np.add(rewards, reward_per_block, out=rewards, where=hits)
+
+    # Adjust hash rate gradually based on price changes with randomness; new miners skip their first step
+    adjusting = mining & (days_active != 0)
+    if price_change_percentage > 5:
+        randomness_factor *= 1.05
+        np.multiply(hash_rates, randomness_factor, out=hash_rates, where=adjusting)
+    elif price_change_percentage < -5:
+        randomness_factor *= 0.95
+        np.multiply(hash_rates, randomness_factor, out=hash_rates, where=adjusting)
+
+    # Ensure hash rate stays within bounds
+    np.clip(hash_rates, MIN_HASH_RATE, 100, out=hash_rates)
+    days_active += mining
+
+    # Reactivate dormant miners if price increases significantly; they start mining next step
+    num_reactivated = 0
+    if not mining.all():
+        reactivated = ~mining & (price > dormant_prices * 1.1)
+        hash_rates[reactivated] = np.maximum(initial_hash_rates[reactivated] * restart_factor[reactivated], MIN_HASH_RATE)
+        active[reactivated] = True
+        num_reactivated = int(reactivated.sum())
+
+    return int(hits.sum()), num_reactivated, float(np.dot(active, hash_rates))
+
+def _state_array(size, fill, dtype):
+    # Storage for one per-miner state variable
+    if PURE_PYTHON:
+        return [fill] * size
+    return np.full(size, fill, dtype=dtype)
+
+def _grow_history(history):
+    # Double the capacity of a preallocated history array, keeping its contents
+    return np.concatenate((history, np.empty_like(history)))
+
+class MinerDataCollector(mesa.DataCollector):
+    # Records agent variables straight from the model's state arrays instead of calling reporters per agent.
+    # Rows are collected steps and columns are miners; float32 is plenty for values that are only plotted.
+    def __init__(self, model_reporters=None, num_rows=1, num_miners=1):
+        super().__init__(model_reporters=model_reporters)
+        self._num_rows = 0
+        self._steps = np.empty(num_rows, dtype=np.int64)
+        self._miner_counts = np.empty(num_rows, dtype=np.int64)
+        self._hash_rates = np.empty((num_rows, num_miners), dtype=np.float32)
+        self._rewards = np.empty((num_rows, num_miners), dtype=np.float32)
+        self._active = np.empty((num_rows, num_miners), dtype=np.int8)
+
+    def collect(self, model):
+        super().collect(model)
+        row = self._num_rows
+        num_miners = len(model.miners)
+        capacity, width = self._hash_rates.shape
+        if row == capacity or num_miners > width:
+            self._resize(2 * capacity if row == capacity else capacity, max(num_miners, width))
+
+        self._steps[row] = model.total_simulation_time
+        self._miner_counts[row] = num_miners
+        self._hash_rates[row, :num_miners] = model.hash_rates
+        self._rewards[row, :num_miners] = model.rewards
+        self._active[row, :num_miners] = model.active_mask
+        self._num_rows += 1
+
+    def _resize(self, num_rows, num_miners):
+        for name in ("_steps", "_miner_counts"):
+            old = getattr(self, name)
+            new = np.empty(num_rows, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        for name in ("_hash_rates", "_rewards", "_active"):
+            old = getattr(self, name)
+            new = np.empty((num_rows, num_miners), dtype=old.dtype)
+            new[:old.shape[0], :old.shape[1]] = old
+            setattr(self, name, new)
+
+    def get_agent_vars_dataframe(self):
+        rows = self._num_rows
+        counts = self._miner_counts[:rows]
+        # Miners added mid-run only have rows from the step they joined
+        recorded = np.arange(self._hash_rates.shape[1]) < counts[:, None]
+        index = pd.MultiIndex.from_arrays(
+            [np.repeat(self._steps[:rows], counts), np.nonzero(recorded)[1]], names=["Step", "AgentID"]
+        )
+        return pd.DataFrame({
+            "Hash_Rate": self._hash_rates[:rows][recorded],
+            "Reward_Balance": self._rewards[:rows][recorded],
+            "Active": self._active[:rows][recorded]
+        }, index=index)
+
+# Difficulty adjustment strategies
+def time_based_adjust(model, new_blocks):
+    # Nudge difficulty by 5% every 50 blocks, depending on the average block time since the last adjustment
+
+    # Target block time (1.0 per block in this case)
+    target_block_time = 1.0
+    blocks_for_adjustment = 50
+
+    # Adjust difficulty at every 50-block boundary crossed by the new blocks
+    first_boundary = (model.blocks_mined - new_blocks) // blocks_for_adjustment * blocks_for_adjustment + blocks_for_adjustment
+    for blocks_mined in range(first_boundary, model.blocks_mined + 1, blocks_for_adjustment):
+        time_since_last_adjustment = model.total_simulation_time - model.last_adjustment_time
+        blocks_since_last_adjustment = blocks_mined - model.last_blocks_mined
+
+        # Calculate the average time to mine a block
+        average_block_time = time_since_last_adjustment / blocks_since_last_adjustment
+
+        # Calculate adjustment factor
+        if average_block_time > target_block_time:
+            # If average block time is greater than target, increase difficulty
+            adjustment_factor = 1.05  # Increase by 5%
+        elif average_block_time < target_block_time:
+            # If average block time is less than target, decrease difficulty
+            adjustment_factor = 0.95  # Decrease by 5%
+        else:
+            # If average block time is exactly equal to target, no change
+            adjustment_factor = 1.0
+
+        # Apply the adjustment factor to the difficulty
+        model.difficulty *= adjustment_factor
+
+        # Enforce difficulty bounds to prevent extreme values
+        model.difficulty = max(model.difficulty, 1.0)  # Minimum difficulty
+        model.difficulty = min(model.difficulty, 10.0)  # Maximum difficulty
+
+        # Update tracking attributes for the next adjustment
+        model.last_adjustment_time = model.total_simulation_time
+        model.last_blocks_mined = blocks_mined
+
+        # Save to difficulty history
+        model.record_difficulty()
+
+        # Debugging output
+        if __debug__ and model.verbose:
+            print(f"Adjusting difficulty to: {model.difficulty:.2f} | Average Block Time: {average_block_time:.2f} | Target: {target_block_time:.2f}")
 
 class Miner(mesa.Agent):
-    def __init__(self, unique_id, model, pos, initial_hash_rate, initial_balance=0):
+    # Thin agent shell; its state is read straight from the model's state arrays, so it is never stale
+    # mesa.Agent keeps a __dict__ for its own attributes; the Miner's live in slots
+    __slots__ = ("pos", "index", "entry_time", "_portrayal_key", "_portrayal")
+
+    def __init__(self, unique_id, model, pos, index):
         super().__init__(unique_id, model)
         self.pos = pos
-        self.hash_rate = max(initial_hash_rate, MIN_HASH_RATE)
-        self.reward_balance = initial_balance
-        self.active = True
-        self.state = "active"
-        self.dormant_price = 0
-        self.initial_hash_rate = self.hash_rate
+        self.index = index  # Row of this miner in the model's state arrays
         self.entry_time = 0
-        self.days_active = 0
+        self._portrayal_key = None  # Displayed values the portrayal currently shows
+        self._portrayal = {"Shape": "circle", "Filled": "true", "r": 0.5, "Layer": 0, "Color": "green", "text": ""}
 
-    def mine(self):
-        total_network_hash_rate = self.model.get_total_hash_rate()
-        block_found_probability = self.hash_rate / total_network_hash_rate
+    @property
+    def hash_rate(self):
+        return float(self.model.hash_rates[self.index])
 
-        if random.random() < block_found_probability:
-            block_reward = self.model.block_reward * self.model.bitcoin_price
-            self.reward_balance += block_reward
-            return True
-        return False
+    @property
+    def reward_balance(self):
+        return float(self.model.rewards[self.index])
 
-    def adjust_hash_rate(self):
-        if self.days_active == 0:
-            return
+    @property
+    def active(self):
+        return bool(self.model.active_mask[self.index])
 
-        # Calculate price change percentage
-        price_change = self.model.bitcoin_price - self.model.previous_price
-        price_change_percentage = (price_change / max(self.model.previous_price, 1)) * 100
+    @property
+    def state(self):
+        return "active" if self.active else "dormant"
 
-        # Add randomness to the adjustment factor
-        randomness_factor = random.uniform(0.95, 1.05)  # Random multiplier between 0.95 and 1.05
+    @property
+    def dormant_price(self):
+        return float(self.model.dormant_prices[self.index])
 
-        # Adjust hash rate gradually based on price changes with randomness
-        if price_change_percentage > 5:
-            self.hash_rate *= 1.05 * randomness_factor  # Moderate increase with randomness
-        elif price_change_percentage < -5:
-            self.hash_rate *= 0.95 * randomness_factor  # Moderate decrease with randomness
-
-        # Ensure hash rate stays within bounds
-        self.hash_rate = max(MIN_HASH_RATE, min(self.hash_rate, 100))
-
-    def step(self):
-        if not self.active:
-            if self.model.bitcoin_price > self.dormant_price * 1.1:  # Reactivate if price increases significantly
-                self.active = True
-                self.state = "active"
-                self.hash_rate = max(self.initial_hash_rate * random.uniform(0.8, 1.0), MIN_HASH_RATE)
-            return
+    @property
+    def initial_hash_rate(self):
+        return float(self.model.initial_hash_rates[self.index])
 
-        if self.mine():
-            self.model.adjust_difficulty()
-
-        self.adjust_hash_rate()
-        self.days_active += 1
+    @property
+    def days_active(self):
+        return int(self.model.days_active[self.index])
 
 class BitcoinMiningModel(mesa.Model):
-    def __init__(self, num_miners=25, initial_block_reward=6.25):
+    def __init__(self, num_miners=25, initial_block_reward=6.25, seed=None, verbose=False, visualize=False,
+                 max_steps=1000, collect_every=1, difficulty_strategy=time_based_adjust):
+        self.rng = np.random.default_rng(seed)  # Single PCG64 generator for all model randomness
         self.total_simulation_time = 0
         self.blocks_mined = 0
         self.width = 10
         self.height = 10
-        self.grid = mesa.space.MultiGrid(self.width, self.height, True)
-        self.schedule = mesa.time.RandomActivation(self)
+        self.visualize = visualize  # Miners are only placed on a grid when the model is displayed
+        self.grid = mesa.space.MultiGrid(self.width, self.height, True) if visualize else None
         self.running = True
         self.block_reward = initial_block_reward
         self.difficulty = 1
         self.bitcoin_price = 1
-        self.price_history = [1]
+        self._reward_per_block = self.block_reward * self.bitcoin_price  # Refreshed with every price update
+        self.max_steps = max_steps
+        # Histories are preallocated for max_steps and doubled if the run goes longer
+        self._price_history = np.empty(max_steps + 1, dtype=np.float64)
+        self._price_history[0] = 1
+        self._t = 0
+        self._price_draws = []  # Pre-drawn (normal, shock roll, shock) triples for upcoming steps
+        self._price_draw_index = 0
         self.previous_price = self.bitcoin_price
-        self.difficulty_history = [1]
+        self._difficulty_history = np.empty(max_steps // 50 + 1, dtype=np.float64)
+        self._difficulty_history[0] = 1
+        self._num_difficulty_adjustments = 0
+        self.last_adjustment_time = 0
+        self.last_blocks_mined = 0
+        self.difficulty_strategy = difficulty_strategy  # Called with the model and the number of newly mined blocks
+        self.verbose = verbose  # Print difficulty adjustments as they happen
+        self.collect_every = collect_every  # Steps between DataCollector snapshots, None to skip collection
         self.miners = []
         self.next_miner_id = 0
+        # Per-miner state stored as arrays, one row per miner
+        self.hash_rates = _state_array(num_miners, 0.0, np.float64)
+        self.rewards = _state_array(num_miners, 0.0, np.float64)
+        self.active_mask = _state_array(num_miners, False, bool)
+        self.dormant_prices = _state_array(num_miners, 0.0, np.float64)
+        self.initial_hash_rates = _state_array(num_miners, 0.0, np.float64)
+        self.days_active = _state_array(num_miners, 0, np.int64)
+        # Running network totals, maintained on hash rate changes and state transitions
+        self._total_hash_rate = 0.0
+        self.active_count = 0
+        self._step_buffers = {}  # Per-step scratch arrays, see _step_buffer
         self.create_initial_miners(num_miners)
-        self.datacollector = mesa.DataCollector(
+        self.datacollector = MinerDataCollector(
             model_reporters={
-                "Total_Hash_Rate": lambda m: m.get_total_hash_rate(),
-                "Difficulty": lambda m: m.difficulty,
-                "Blocks_Mined": lambda m: m.blocks_mined,
-                "Bitcoin_Price": lambda m: m.bitcoin_price,
-                "Active_Miners": lambda m: len([a for a in m.schedule.agents if a.active])
+                "Total_Hash_Rate": self.get_total_hash_rate,
+                "Difficulty": "difficulty",
+                "Blocks_Mined": "blocks_mined",
+                "Bitcoin_Price": "bitcoin_price",
+                "Active_Miners": "active_count"
             },
-            agent_reporters={
-                "Hash_Rate": lambda a: a.hash_rate,
-                "Reward_Balance": lambda a: a.reward_balance,
-                "Active": lambda a: 1 if a.active else 0
-            }
+            num_rows=max_steps // collect_every + 1 if collect_every else 1,
+            num_miners=num_miners
         )
 
     def create_initial_miners(self, num_miners):
         base_hash_rate = max(MIN_NETWORK_HASH_RATE / num_miners, MIN_HASH_RATE)
 
-        for _ in range(num_miners):
-            initial_hash_rate = base_hash_rate * random.uniform(0.8, 1.2)
-            self.add_new_miner(initial_hash_rate)
+        for initial_hash_rate in base_hash_rate * self.rng.uniform(0.8, 1.2, num_miners):
+            self.add_new_miner(float(initial_hash_rate))
 
     def add_new_miner(self, initial_hash_rate=None):
-        x = self.random.randrange(self.width)
-        y = self.random.randrange(self.height)
-        pos = (x, y)
+        pos = None
+        if self.visualize:
+            # Placement uses mesa's own seeded self.random so the simulation stream in self.rng is the same headless or not
+            x = self.random.randrange(self.width)
+            y = self.random.randrange(self.height)
+            pos = (x, y)
 
         if initial_hash_rate is None:
-            market_attractiveness = self.bitcoin_price * self.block_reward
-            initial_hash_rate = random.uniform(0.1, min(10, market_attractiveness))
+            market_attractiveness = self._reward_per_block
+            initial_hash_rate = self.rng.uniform(0.1, min(10, market_attractiveness))
 
         initial_hash_rate = max(initial_hash_rate, MIN_HASH_RATE)
 
-        miner = Miner(self.next_miner_id, self, pos, initial_hash_rate)
+        index = len(self.miners)
+        if index == len(self.hash_rates):
+            self._grow_state_arrays()
+        self.hash_rates[index] = initial_hash_rate
+        self.rewards[index] = 0
+        self.active_mask[index] = True
+        self.dormant_prices[index] = 0
+        self.initial_hash_rates[index] = initial_hash_rate
+        self.days_active[index] = 0
+
+        miner = Miner(self.next_miner_id, self, pos, index)
         miner.entry_time = self.total_simulation_time
-        self.grid.place_agent(miner, pos)
-        self.schedule.add(miner)
+        if self.visualize:
+            self.grid.place_agent(miner, pos)
         self.miners.append(miner)
         self.next_miner_id += 1
+        self.active_count += 1
+        self._total_hash_rate += initial_hash_rate
+
+    def _grow_state_arrays(self):
+        # Miners added after initialization get one extra row in every state array
+        for name, fill in (("hash_rates", 0.0), ("rewards", 0.0), ("active_mask", False),
+                           ("dormant_prices", 0.0), ("initial_hash_rates", 0.0), ("days_active", 0)):
+            state = getattr(self, name)
+            if PURE_PYTHON:
+                state.append(fill)
+            else:
+                setattr(self, name, np.append(state, fill))
+
+    def reactivate_cheapest_miners(self, count):
+        # Wake the miners that went dormant at the lowest prices first
+        dormant = [index for index, active in enumerate(self.active_mask) if not active]
+        dormant.sort(key=lambda index: self.dormant_prices[index])
+        for index in dormant[:count]:
+            self.hash_rates[index] = self.initial_hash_rates[index]
+            self.active_mask[index] = True
+            self.active_count += 1
+            self._total_hash_rate += self.hash_rates[index]
 
     def simulate_bitcoin_price(self):
-        last_price = self.price_history[-1]
+        last_price = self._price_history[self._t]
         base_growth_rate = 0.001
         base_volatility = 0.05
-        random_walk = random.gauss(0, base_volatility * last_price)
-
-        if random.random() < 0.1:
-            shock = random.uniform(-0.2, 0.2)
+        if self._price_draw_index == len(self._price_draws):
+            self._price_draws = np.column_stack((
+                self.rng.standard_normal(PRICE_DRAW_BATCH),
+                self.rng.random(PRICE_DRAW_BATCH),
+                self.rng.uniform(-0.2, 0.2, PRICE_DRAW_BATCH)
+            )).tolist()
+            self._price_draw_index = 0
+        normal, shock_roll, shock = self._price_draws[self._price_draw_index]
+        self._price_draw_index += 1
+
+        random_walk = normal * base_volatility * last_price
+
+        if shock_roll < 0.1:
             random_walk += shock * last_price
 
         new_price = last_price * (1 + base_growth_rate) + random_walk
         self.previous_price = self.bitcoin_price
-        self.bitcoin_price = max(new_price, 1)
-        self.price_history.append(self.bitcoin_price)
+        self.bitcoin_price = new_price if new_price > 1 else 1
+        self._reward_per_block = self.block_reward * self.bitcoin_price
+        if self._t + 1 == len(self._price_history):
+            self._price_history = _grow_history(self._price_history)
+        self._price_history[self._t + 1] = self.bitcoin_price
+        self._t += 1
+
+    @property
+    def price_history(self):
+        return self._price_history[:self._t + 1]
+
+    @property
+    def difficulty_history(self):
+        return self._difficulty_history[:self._num_difficulty_adjustments + 1]
 
     def get_total_hash_rate(self):
-        total_hash_rate = sum(agent.hash_rate for agent in self.schedule.agents if agent.active)
-        return max(total_hash_rate, MIN_NETWORK_HASH_RATE)
+        # Kept current incrementally and resummed from scratch by every step, so it never drifts far
+        return max(self._total_hash_rate, MIN_NETWORK_HASH_RATE)
 
     
     
-    def adjust_difficulty(self):
-        self.blocks_mined += 1
-
-        # Initialize attributes for tracking adjustments
-        if not hasattr(self, "last_adjustment_time"):
-            self.last_adjustment_time = self.total_simulation_time
-        if not hasattr(self, "last_blocks_mined"):
-            self.last_blocks_mined = 0
-
-        # Target block time (1.0 per block in this case)
-        target_block_time = 1.0
-        blocks_for_adjustment = 50
-
-        # Adjust difficulty after every 50 blocks
-        if self.blocks_mined % blocks_for_adjustment == 0:
-            time_since_last_adjustment = self.total_simulation_time - self.last_adjustment_time
-            blocks_since_last_adjustment = self.blocks_mined - self.last_blocks_mined
-
-            # Calculate the average time to mine a block
-            average_block_time = time_since_last_adjustment / blocks_since_last_adjustment
-
-            # Calculate adjustment factor
-            if average_block_time > target_block_time:
-                # If average block time is greater than target, increase difficulty
-                adjustment_factor = 1.05  # Increase by 5%
-            elif average_block_time < target_block_time:
-                # If average block time is less than target, decrease difficulty
-                adjustment_factor = 0.95  # Decrease by 5%
-            else:
-                # If average block time is exactly equal to target, no change
-                adjustment_factor = 1.0
-
-            # Apply the adjustment factor to the difficulty
-            self.difficulty *= adjustment_factor
-
-            # Enforce difficulty bounds to prevent extreme values
-            self.difficulty = max(self.difficulty, 1.0)  # Minimum difficulty
-            self.difficulty = min(self.difficulty, 10.0)  # Maximum difficulty
-
-            # Update tracking attributes for the next adjustment
-            self.last_adjustment_time = self.total_simulation_time
-            self.last_blocks_mined = self.blocks_mined
-
-            # Save to difficulty history
-            self.difficulty_history.append(self.difficulty)
-
-            # Debugging output
-            print(f"Adjusting difficulty to: {self.difficulty:.2f} | Average Block Time: {average_block_time:.2f} | Target: {target_block_time:.2f}")
+    def adjust_difficulty(self, n=1):
+        self.blocks_mined += n
+        self.difficulty_strategy(self, n)
+
+    def record_difficulty(self):
+        if self._num_difficulty_adjustments + 1 == len(self._difficulty_history):
+            self._difficulty_history = _grow_history(self._difficulty_history)
+        self._difficulty_history[self._num_difficulty_adjustments + 1] = self.difficulty
+        self._num_difficulty_adjustments += 1
+
+    def step_all(self):
+        num_miners = len(self.miners)
+
+        # Draw the step's random numbers in one batch per purpose
+        if PURE_PYTHON:
+            mine_draws = self.rng.random(num_miners).tolist()
+            randomness_factor = self.rng.uniform(0.95, 1.05, num_miners).tolist()
+            restart_factor = self.rng.uniform(0.8, 1.0, num_miners).tolist()
+        else:
+            mine_draws = self._step_buffer("mine_draws", np.float64)
+            self.rng.random(out=mine_draws)
+            randomness_factor = self._draw_uniform("randomness_factor", 0.95, 1.05)
+            restart_factor = self._draw_uniform("restart_factor", 0.8, 1.0)
+
+        # Inputs shared by every miner are derived once per step; all miners mine against the same network hash rate
+        total_network_hash_rate = self.get_total_hash_rate()
+        price_change = self.bitcoin_price - self.previous_price
+        price_change_percentage = (price_change / max(self.previous_price, 1)) * 100
+
+        # The kernel is compiled under numba and runs as plain Python on PyPy; otherwise use NumPy
+        step_miners = _step_kernel if HAVE_NUMBA or PURE_PYTHON else _step_arrays
+        blocks_found, num_reactivated, total_hash_rate = step_miners(
+            self.hash_rates, self.rewards, self.active_mask, self.dormant_prices,
+            self.initial_hash_rates, self.days_active, float(self.bitcoin_price), float(price_change_percentage),
+            float(self._reward_per_block), total_network_hash_rate, mine_draws, randomness_factor, restart_factor
+        )
 
+        self.active_count += num_reactivated
+        self._total_hash_rate = float(total_hash_rate)
+        if blocks_found:
+            self.adjust_difficulty(blocks_found)
+
+    def _step_buffer(self, name, dtype):
+        # Scratch arrays are reused across steps and only reallocated when the number of miners changes
+        buffer = self._step_buffers.get(name)
+        if buffer is None or len(buffer) != len(self.miners):
+            buffer = self._step_buffers[name] = np.empty(len(self.miners), dtype=dtype)
+        return buffer
+
+    def _draw_uniform(self, name, low, high):
+        buffer = self._step_buffer(name, np.float64)
+        self.rng.random(out=buffer)
+        buffer *= high - low
+        buffer += low
+        return buffer
 
     def step(self):
-        active_miners = len([a for a in self.schedule.agents if a.active])
-        if active_miners < 3:
-            dormant_miners = [a for a in self.schedule.agents if not a.active]
-            dormant_miners.sort(key=lambda x: x.dormant_price)
-            for miner in dormant_miners[:3 - active_miners]:
-                miner.active = True
-                miner.state = "active"
-                miner.hash_rate = miner.initial_hash_rate
+        # Only scan for dormant miners when some exist; with fewer than three miners all of them may be active
+        if self.active_count < min(3, len(self.miners)):
+            self.reactivate_cheapest_miners(3 - self.active_count)
 
         self.simulate_bitcoin_price()
-        self.schedule.step()
-        self.datacollector.collect(self)
+        self.step_all()
         self.total_simulation_time += 1
+        if self.collect_every and self.total_simulation_time % self.collect_every == 0:
+            self.datacollector.collect(self)
         self.previous_price = self.bitcoin_price
 
-    def run_simulation(self, max_steps=1000):
+    def run_simulation(self, max_steps=None):
+        if max_steps is None:
+            max_steps = self.max_steps
         while self.running and self.total_simulation_time < max_steps:
             self.step()
 
+    @classmethod
+    def run_many(cls, n_runs, max_steps=1000, n_workers=None):
+        # Monte Carlo replication: one independent run per seed 0..n_runs-1, as (price_history, difficulty_history)
+        # Only the histories are returned, so the datacollector is skipped entirely
+        configs = [{"seed": seed, "max_steps": max_steps, "collect_every": None} for seed in range(n_runs)]
+        return _map_runs(cls, configs, _histories, n_workers)
+
+# Batch runs
+def _model_vars(model):
+    return model.datacollector.get_model_vars_dataframe()
+
+def _histories(model):
+    return model.price_history.copy(), model.difficulty_history.copy()
+
+def _run_one(job):
+    # Module level so Pool workers can pickle it; only the job and the extracted result cross processes
+    model_cls, config, extract = job
+    model = model_cls(**config)
+    model.run_simulation()
+    return extract(model)
+
+def _map_runs(model_cls, configs, extract, n_workers):
+    with multiprocessing.Pool(n_workers) as pool:
+        return pool.map(_run_one, [(model_cls, config, extract) for config in configs])
+
+def run_batch(configs, n_workers=None):
+    # Each config is a dict of BitcoinMiningModel keyword arguments, e.g. {"num_miners": 50, "seed": 1}
+    configs = list(configs)
+    return list(zip(configs, _map_runs(BitcoinMiningModel, configs, _model_vars, n_workers)))
+
 # Visualization setup
 def miner_portrayal(agent):
     if not agent:
         return
 
-    portrayal = {
-        "Shape": "circle",
-        "Filled": "true",
-        "r": 0.5,
-        "Layer": 0,
-        "Color": "green" if agent.active else "red",
-        "text": f"HR: {agent.hash_rate:.2f}\nReward: {agent.reward_balance:.2f}"
-    }
+    # Each miner owns one portrayal dict; only refresh it when the displayed values change
+    portrayal = agent._portrayal
+    key = (round(agent.hash_rate, 2), round(agent.reward_balance, 2), agent.active)
+    if key != agent._portrayal_key:
+        portrayal["Color"] = "green" if agent.active else "red"
+        portrayal["text"] = f"HR: {agent.hash_rate:.2f}\nReward: {agent.reward_balance:.2f}"
+        agent._portrayal_key = key
     return portrayal
 
 def run_simulation_server():
@@ -250,7 +544,8 @@ def run_simulation_server():
         [grid, hash_rate_chart, difficulty_chart, blocks_mined_chart],
         "Bitcoin Mining Simulation",
         {
-            "num_miners": UserParam.Slider("Number of Miners", 25, 1, 50)
+            "num_miners": UserParam.Slider("Number of Miners", 25, 1, 50),
+            "visualize": True
         }
     )
 